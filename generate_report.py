@@ -2,83 +2,101 @@ import parsing
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import functools
 import io
-
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+from concurrent.futures import ThreadPoolExecutor
+
+# matplotlib, seaborn and reportlab are imported inside the functions that use them,
+# so importing this module (or just parsing the logs) doesn't pay for them up front.
+
+@functools.lru_cache(maxsize=None)
+def _setup_plotting():
+    """Selects the non-interactive Agg backend and applies the report's plot style, once.
+
+    The style lives in global matplotlib state, so this must run before any figures are
+    rendered in worker threads; later calls are no-ops. seaborn is imported here too, after
+    the backend is chosen, so the threads don't each trigger the first import.
+    """
+    import matplotlib
+    import matplotlib.style
+    matplotlib.use('Agg')
+    matplotlib.style.use('ggplot')
+    import seaborn  # noqa: F401
+
+def _new_figure(figsize):
+    """Creates a standalone Agg figure that isn't tracked by pyplot's global state."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    _setup_plotting()
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def _figure_to_image(fig, width, height):
+    """Renders a figure to PNG in memory and wraps it in a ReportLab Image."""
+    from reportlab.platypus import Image
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    buffer.seek(0)
+    return Image(buffer, width=width, height=height)
 
 def plot_battery_level_for_pdf(battery_df):
     """Generates the battery level plot and returns it as a ReportLab Image."""
     if battery_df.empty:
         return None
-    plt.style.use('ggplot')
-    fig, ax = plt.subplots(figsize=(10, 5))
-    battery_df.plot(y='level', marker='o', ax=ax)
+    from reportlab.lib.units import inch
+    fig = _new_figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.plot(battery_df.index, battery_df['level'], marker='o', label='level')
+    ax.legend()
     ax.set_title('Battery Level Over Time')
+    ax.set_xlabel(battery_df.index.name)
     ax.set_ylabel('Battery Level (%)')
     ax.set_ylim(0, 100)
-    plt.tight_layout()
-
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight')
-    plt.close(fig)
-    buffer.seek(0)
-    return Image(buffer, width=7*inch, height=3.5*inch)
+    return _figure_to_image(fig, width=7*inch, height=3.5*inch)
 
 def plot_top_consumers_for_pdf(power_df, top_n=15):
     """Generates the top consumers plot and returns it as a ReportLab Image."""
     if power_df.empty:
         return None
+    from reportlab.lib.units import inch
+    fig = _new_figure(figsize=(10, 8))
+    import seaborn as sns  # after _new_figure, which selects the Agg backend first
+    ax = fig.subplots()
     top_consumers = power_df.head(top_n)
-    plt.style.use('ggplot')
-    fig, ax = plt.subplots(figsize=(10, 8))
     sns.barplot(x='power_mah', y='name', data=top_consumers, ax=ax, palette='viridis')
     ax.set_title(f'Top {top_n} Power Consumers (Total mAh)')
     ax.set_xlabel('Total Power Consumed (mAh)')
     ax.set_ylabel('Application / Component')
-    plt.tight_layout()
-
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight')
-    plt.close(fig)
-    buffer.seek(0)
-    return Image(buffer, width=7*inch, height=5*inch)
+    return _figure_to_image(fig, width=7*inch, height=5*inch)
 
 def plot_top_longwakes_for_pdf(wakelock_df, top_n=20):
     """Generates the top longwakes plot and returns it as a ReportLab Image."""
     if wakelock_df.empty:
         return None
+    from reportlab.lib.units import inch
+    fig = _new_figure(figsize=(10, 10))
+    import seaborn as sns  # after _new_figure, which selects the Agg backend first
+    ax = fig.subplots()
     top_items = wakelock_df.head(top_n).copy()
     if 'app_name' in top_items.columns:
-        top_items['label'] = top_items['app_name'] + ': ' + top_items['tag'].str.split('/').str[-1]
+        top_items['label'] = top_items['app_name'] + ': ' + top_items['tag'].str.rpartition('/')[2]
     else:
         top_items['label'] = top_items['uid'] + ': ' + top_items['tag']
-    
-    plt.style.use('ggplot')
-    fig, ax = plt.subplots(figsize=(10, 10))
+
     sns.barplot(x='duration_s', y='label', data=top_items, ax=ax, palette='plasma')
     ax.set_title(f'Top {top_n} Longwake Durations')
     ax.set_xlabel('Total Duration (seconds)')
     ax.set_ylabel('Wakelock App & Tag')
-    plt.tight_layout()
+    return _figure_to_image(fig, width=7*inch, height=6*inch)
 
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', bbox_inches='tight')
-    plt.close(fig)
-    buffer.seek(0)
-    return Image(buffer, width=7*inch, height=6*inch)
+def rows_to_table(rows, font_size=8):
+    """Converts a list of rows (the first being the header) to a styled ReportLab Table."""
+    from reportlab.platypus import Table, TableStyle
+    from reportlab.lib import colors
 
-def df_to_table(df, font_size=8):
-    """Converts a pandas DataFrame to a ReportLab Table object with styling."""
-    # Round numeric columns to 3 decimal places for cleaner display
-    df_rounded = df.round(3)
-    data = [df_rounded.columns.to_list()] + df_rounded.values.tolist()
-    
-    table = Table(data, hAlign='LEFT')
+    table = Table(rows, hAlign='LEFT')
     style = TableStyle([
         ('BACKGROUND', (0, 0), (-1, 0), colors.darkslategray),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -92,8 +110,18 @@ def df_to_table(df, font_size=8):
     table.setStyle(style)
     return table
 
+def df_to_table(df, font_size=8):
+    """Converts a pandas DataFrame to a ReportLab Table object with styling."""
+    # Round numeric columns to 3 decimal places for cleaner display
+    df_rounded = df.round(3)
+    return rows_to_table([df_rounded.columns.to_list()] + df_rounded.values.tolist(), font_size=font_size)
+
 def create_report():
     """Generates a complete PDF report of the battery analysis."""
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+
     print("Starting report generation...")
     
     # 1. Setup paths and get data
@@ -103,18 +131,13 @@ def create_report():
     pdf_path = results_dir / f"battery_report_{timestamp}.pdf"
 
     print("Processing logs...")
-    battery_df, power_df, longwake_df = parsing.process_all_logs()
+    log_dirs = parsing.get_log_dirs()
+    battery_df, power_df, longwake_df = parsing.process_all_logs(log_dirs)
     
-    # Re-create combined_df logic from the notebook
+    # Re-create combined_df logic from the notebook. process_all_logs already maps each
+    # wakelock's uid to an app_name the same way power consumers are named, so use that.
     if not longwake_df.empty:
-        # This logic is from the notebook to get app names from wakelock tags
-        def get_package_name_from_tag(tag):
-            import re
-            match = re.search(r'([a-zA-Z0-9_]+\.[a-zA-Z0-9_\.]+)', tag)
-            return match.group(1) if match else 'System/Other'
-        
-        longwake_df['name'] = longwake_df['tag'].apply(get_package_name_from_tag)
-        app_wakelocks = longwake_df.groupby('name')['duration_s'].sum().reset_index()
+        app_wakelocks = longwake_df.groupby('app_name')['duration_s'].sum().rename_axis('name').reset_index()
         
         if not power_df.empty:
             combined_df = pd.merge(power_df, app_wakelocks, on='name', how='outer').fillna(0)
@@ -125,8 +148,21 @@ def create_report():
     else:
         combined_df = pd.DataFrame()
 
+    # The three figures are independent Agg figures, so render them concurrently.
+    print("Rendering plots...")
+    _setup_plotting()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        battery_plot_future = executor.submit(plot_battery_level_for_pdf, battery_df)
+        power_plot_future = executor.submit(plot_top_consumers_for_pdf, power_df)
+        longwake_plot_future = executor.submit(plot_top_longwakes_for_pdf, longwake_df)
+    battery_plot = battery_plot_future.result()
+    power_plot = power_plot_future.result()
+    longwake_plot = longwake_plot_future.result()
+
     # 2. Build PDF story
-    doc = SimpleDocTemplate(str(pdf_path))
+    # ReportLab writes into memory; the finished PDF goes to disk in a single write below.
+    pdf_buffer = io.BytesIO()
+    doc = SimpleDocTemplate(pdf_buffer)
     styles = getSampleStyleSheet()
     story = []
 
@@ -137,17 +173,17 @@ def create_report():
     # --- Device Info ---
     print("Adding device info...")
     story.append(Paragraph("1. Device Information", styles['h2']))
-    log_dirs = parsing.get_log_dirs()
     if log_dirs:
         latest_log_dir = log_dirs[-1]
         device_info = parsing.parse_device_info(latest_log_dir)
-        info_data = [
+        info_rows = [
+            ['Metric', 'Value'],
             ['Log Source:', latest_log_dir.name],
             ['Phone Model:', device_info.get('model', 'N/A')],
             ['Android OS Version:', device_info.get('android_version', 'N/A')],
             ['Estimated Battery Health:', device_info.get('battery_health_percent', 'N/A')]
         ]
-        story.append(df_to_table(pd.DataFrame(info_data, columns=['Metric', 'Value'])))
+        story.append(rows_to_table(info_rows))
     else:
         story.append(Paragraph("Could not find log directories.", styles['Normal']))
     story.append(Spacer(1, 0.2 * inch))
@@ -155,7 +191,6 @@ def create_report():
     # --- Battery Level ---
     print("Adding battery level plot...")
     story.append(Paragraph("2. Battery Level Over Time", styles['h2']))
-    battery_plot = plot_battery_level_for_pdf(battery_df)
     if battery_plot:
         story.append(battery_plot)
     else:
@@ -170,7 +205,6 @@ def create_report():
     if not power_df.empty:
         story.append(df_to_table(power_df.head(15)))
         story.append(Spacer(1, 0.2 * inch))
-        power_plot = plot_top_consumers_for_pdf(power_df)
         if power_plot:
             story.append(power_plot)
     else:
@@ -185,7 +219,6 @@ def create_report():
     if not longwake_df.empty:
         story.append(df_to_table(longwake_df.head(15)))
         story.append(Spacer(1, 0.2 * inch))
-        longwake_plot = plot_top_longwakes_for_pdf(longwake_df)
         if longwake_plot:
             story.append(longwake_plot)
     else:
@@ -205,6 +238,7 @@ def create_report():
     # 3. Build the PDF
     print("Building PDF...")
     doc.build(story)
+    pdf_path.write_bytes(pdf_buffer.getvalue())
     print(f"\nSuccessfully generated report: {pdf_path}")
 
 if __name__ == '__main__':
@@ -1,131 +1,266 @@
+import functools
+import hashlib
+import heapq
+import mmap
+import os
+import pickle
 import re
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import seaborn as sns
 
 # --- CONFIGURATION ---
 LOGS_DIR = Path(__file__).parent / 'logs'
+# Longwake events are (timestamp, status, uid, tag) tuples.
+_EVENT_COLUMNS = ['timestamp', 'status', 'uid', 'tag']
+# Order of longwake events: by time, with ends ahead of starts at the same instant so an
+# end never closes a start from that same instant.
+_EVENT_ORDER = itemgetter(0, 1)
+CACHE_DIR = Path(__file__).parent / 'results' / '.cache'
+CACHE_VERSION = 5 # Bump whenever a cached parser's output changes
+
+# --- REGEX PATTERNS ---
+
+# Durations such as '1d02h03m04s005ms', as used for history offsets; under a day there is no
+# 'd' part. The (?!s) stops the '005ms' part being read as minutes.
+_DURATION_PATTERN = r'(?:(?P<d>\d+)d)?(?:(?P<h>\d+)h)?(?:(?P<m>\d+)m(?!s))?(?:(?P<s>\d+)s)?(?:(?P<ms>\d+)ms)?'
+_DURATION_RE = re.compile(r'[+-]?' + _DURATION_PATTERN)
+
+# Patterns for batterystats.txt are bytes patterns: the file is scanned through an mmap
+# and only the captured fields are decoded.
+
+# One match per history line that carries longwake events, e.g.
+#   '+1h02m03s456ms (2) 085 +longwake=u0a123:"tag"'
+# The duration parts are captured directly so no second regex pass is needed per line.
+_HISTORY_LONGWAKE_LINE_RE = re.compile(
+    rb'^[ \t]*\+' + _DURATION_PATTERN.encode() +
+    rb'[ \t]+\(\d+\)[ \t]+\d{3}[ \t]+(?P<details>[^\n]*longwake=[^\n]*)',
+    re.MULTILINE
+)
+_LONGWAKE_RE = re.compile(rb'([+-])longwake=([^:]+):"(.*?)"')
+_RESET_TIME_RE = re.compile(rb'RESET:TIME: (\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})')
+
+# The power section runs from its header to the first blank line (or the per-app packet stats).
+_POWER_SECTION_END_RE = re.compile(rb'^[ \t\r]*$|^[^\n]*Per-app mobile ms per packet', re.MULTILINE)
+_POWER_CONSUMER_RE = re.compile(rb'^[ \t]{2,}(.+?):[ \t]*([\d.]+)[^\n]*', re.MULTILINE)
+# The battery capacity line, looked up by parse_device_info.
+_CAPACITY_RE = re.compile(rb'Capacity: (\d+)')
+
+# Applied to a consumer's decoded label when it isn't simply 'Uid <uid>'.
+_UID_RE = re.compile(r'uid\s+([^\s]+)', re.IGNORECASE)
+# Patterns for the smaller text files.
+_LEVEL_RE = re.compile(r'level:\s*(\d+)')
+_PACKAGE_RE = re.compile(r"package:(.*?)\s+uid:(\d+)")
+
+# Log dirs are named after their collection time, '%Y-%m-%d_%H-%M'.
+_LOG_DIR_NAME_RE = re.compile(r'\d{4}-\d{2}-\d{2}_\d{2}-\d{2}')
 
 # --- PARSING FUNCTIONS ---
 
+def _map_file(file_path):
+    """Memory-maps a file read-only so it can be scanned with bytes regexes without decoding it."""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''  # mmap refuses zero-length files
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _cached_by_file(parse_func):
+    """Memoizes a file parser's result on disk, keyed by the file's path, mtime and size.
+
+    Old log dirs never change, so repeat runs only pay for parsing new ones. Only results that
+    parse_func returns are cached: it must raise on errors that may not last (e.g. a file that
+    is still locked by the collector), not return an empty result, or that result would stick.
+    """
+    def cache_file_for(file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        key_source = f"{CACHE_VERSION}:{parse_func.__name__}:{Path(file_path).resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+        return CACHE_DIR / f"{hashlib.blake2b(key_source.encode(), digest_size=16).hexdigest()}.pkl"
+
+    @functools.wraps(parse_func)
+    def wrapper(file_path):
+        cache_file = cache_file_for(file_path)
+        if cache_file is None:
+            return parse_func(file_path)
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # A corrupt entry can fail in many ways (UnpicklingError, ImportError, ValueError,
+            # ...); drop it so is_cached() stops reporting it, and parse the file again.
+            try:
+                cache_file.unlink()
+            except OSError:
+                pass
+
+        result = parse_func(file_path)
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write then rename so parallel workers never read a half-written entry.
+            tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            print(f"Could not cache parse results for {file_path}: {e}")
+        return result
+
+    def is_cached(file_path):
+        """Tells whether a call for file_path would be answered from the cache."""
+        cache_file = cache_file_for(file_path)
+        return cache_file is not None and cache_file.exists()
+
+    wrapper.is_cached = is_cached
+    return wrapper
+
 def get_log_dirs():
     """Finds and sorts all timestamped log directories."""
     if not LOGS_DIR.is_dir():
         return []
-    log_dirs = [d for d in LOGS_DIR.iterdir() if d.is_dir()]
-    log_dirs.sort(key=lambda x: datetime.strptime(x.name, '%Y-%m-%d_%H-%M'))
+    # scandir's entries already know their type, so this needs no extra stat per entry.
+    with os.scandir(LOGS_DIR) as entries:
+        log_dirs = [Path(entry.path) for entry in entries
+                    if entry.is_dir() and _LOG_DIR_NAME_RE.fullmatch(entry.name)]
+    # Names are fixed-width '%Y-%m-%d_%H-%M' timestamps, so they sort chronologically as strings.
+    # Anything else (e.g. a backup folder) is left out above, or it could sort last and be
+    # taken as the latest log.
+    log_dirs.sort(key=lambda x: x.name)
     return log_dirs
 
 def parse_battery_level(file_path):
     try:
         content = file_path.read_text()
-        match = re.search(r'level:\s*(\d+)', content)
+        match = _LEVEL_RE.search(content)
         if match:
             return int(match.group(1))
     except Exception as e:
         print(f"Could not parse {file_path}: {e}")
     return None
 
-def parse_power_consumers(file_path):
-    """Parses the power consumption section with improved, multi-stage logic."""
+def parse_power_consumers(file_path, content=None):
+    """Parses the power consumption section with improved, multi-stage logic.
+
+    Returns a list of (name, power_mah) tuples. content may be an already mapped copy of the
+    file, so callers can share one mapping. Errors reading the file are raised, not swallowed.
+    """
     consumers = []
+    if content is None:
+        content = _map_file(file_path)
     try:
-        content = file_path.read_text(encoding='utf-8')
-    except Exception as e:
-        print(f"Could not read {file_path}: {e}")
-        return []
-
-    in_power_section = False
-    base_consumer_regex = re.compile(r'^\s{2,}(.+?):\s*([\d\.]+)')
-
-    for line in content.splitlines():
-        if 'Estimated power use (mAh)' in line:
-            in_power_section = True
-            continue
-        if in_power_section:
-            if not line.strip() or 'Per-app mobile ms per packet' in line:
-                break
-            if 'Capacity:' in line or 'Computed drain:' in line:
-                continue
-
-            base_match = base_consumer_regex.search(line)
-            if not base_match:
+        header_pos = content.find(b'Estimated power use (mAh)')
+        if header_pos < 0:
+            return []
+        section_start = content.find(b'\n', header_pos) + 1
+        if not section_start:
+            return []
+        end_match = _POWER_SECTION_END_RE.search(content, section_start)
+        section_end = end_match.start() if end_match else len(content)
+
+        for base_match in _POWER_CONSUMER_RE.finditer(content, section_start, section_end):
+            line = base_match.group(0)
+            if b'Capacity:' in line or b'Computed drain:' in line:
                 continue
 
-            full_label, power_mah = base_match.groups()
+            full_label = base_match.group(1).decode('utf-8', errors='replace')
+            power_mah = float(base_match.group(2))
             name_to_store = full_label.strip()
 
-            name_in_parens_match = re.search(r'\((.*?)\)', full_label)
-            if name_in_parens_match:
-                name_to_store = name_in_parens_match.group(1)
+            # Labels are short and nearly always 'Uid <uid>' or a plain component name, so
+            # plain string operations cover them; the regex is only a fallback.
+            open_paren = full_label.find('(')
+            close_paren = full_label.find(')', open_paren + 1) if open_paren >= 0 else -1
+            words = full_label.split(None, 2)
+            if close_paren >= 0:
+                name_to_store = full_label[open_paren + 1:close_paren]
+            elif len(words) > 1 and words[0].lower() == 'uid':
+                name_to_store = words[1]
             else:
-                uid_match = re.search(r'uid\s+([^\s]+)', full_label, re.IGNORECASE)
+                uid_match = _UID_RE.search(full_label)
                 if uid_match:
                     name_to_store = uid_match.group(1)
 
-            consumers.append({'name': name_to_store, 'power_mah': float(power_mah)})
+            consumers.append((name_to_store, power_mah))
+    except Exception as e:
+        print(f"Could not parse {file_path}: {e}")
+        return []
 
     return consumers
 
+def _duration_from_match(match):
+    """Builds a timedelta from a match of _DURATION_PATTERN (str or bytes pattern)."""
+    d, h, m, s, ms = (int(v) if v else 0 for v in match.group('d', 'h', 'm', 's', 'ms'))
+    return timedelta(days=d, hours=h, minutes=m, seconds=s, milliseconds=ms)
+
 def parse_time(time_str):
-    h, m, s, ms = 0, 0, 0, 0
-    time_str = time_str.strip()
-    if 'h' in time_str:
-        h_match = re.search(r'(\d+)h', time_str)
-        if h_match: h = int(h_match.group(1))
-    if 'm' in time_str:
-        m_match = re.search(r'(\d+)m', time_str)
-        if m_match: m = int(m_match.group(1))
-    if 's' in time_str:
-        s_match = re.search(r'(\d+)s', time_str)
-        if s_match: s = int(s_match.group(1))
-    if 'ms' in time_str:
-        ms_match = re.search(r'(\d+)ms', time_str)
-        if ms_match: ms = int(ms_match.group(1))
-    return timedelta(hours=h, minutes=m, seconds=s, milliseconds=ms)
-
-def parse_battery_history(file_path):
-    """More robust parser for the 'Battery History' section."""
+    """Parses a batterystats duration such as '+1d02h03m04s005ms' into a timedelta."""
+    return _duration_from_match(_DURATION_RE.match(time_str.strip()))
+
+def parse_battery_history(file_path, content=None):
+    """More robust parser for the 'Battery History' section.
+
+    Returns a list of (timestamp, status, uid, tag) tuples sorted by time, with ends ahead of
+    starts at the same instant. content may be an already mapped copy of the file. Errors
+    reading the file are raised, not swallowed.
+    """
     events = []
     start_time = None
+    if content is None:
+        content = _map_file(file_path)
     try:
-        content = file_path.read_text()
-        reset_time_match = re.search(r'RESET:TIME: (\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})', content)
+        # Short runs often log no longwakes at all; a plain substring search rules that out
+        # without running any regex over the file.
+        longwake_pos = content.find(b'longwake=')
+        if longwake_pos < 0:
+            return []
+        reset_time_match = _RESET_TIME_RE.search(content)
         if not reset_time_match:
-            return pd.DataFrame()
-        start_time = datetime.strptime(reset_time_match.group(1), '%Y-%m-%d-%H-%M-%S')
-
-        longwake_regex = re.compile(r'([+-])longwake=([^:]+):"(.*?)"')
-        header_anchor_regex = re.compile(r'\(\d+\)\s+\d{3}\s+')
-
-        for line in content.splitlines():
-            anchor_match = header_anchor_regex.search(line)
-            if not anchor_match:
-                continue
-
-            event_details = line[anchor_match.end():]
-            timestamp_str = line[:anchor_match.start()].strip()
-
-            if not timestamp_str.startswith('+'):
+            return []
+        start_time = datetime.strptime(reset_time_match.group(1).decode('ascii'), '%Y-%m-%d-%H-%M-%S')
+
+        # Only a small share of history lines carry longwakes, so jump between 'longwake='
+        # hits with find() and run the line regex only on the lines that contain one.
+        while longwake_pos >= 0:
+            line_start = content.rfind(b'\n', 0, longwake_pos) + 1
+            line_end = content.find(b'\n', longwake_pos)
+            if line_end < 0:
+                line_end = len(content)
+            longwake_pos = content.find(b'longwake=', line_end)
+            line_match = _HISTORY_LONGWAKE_LINE_RE.match(content, line_start, line_end)
+            if not line_match:
                 continue
 
-            current_time = start_time + parse_time(timestamp_str)
+            current_time = start_time + _duration_from_match(line_match)
 
-            for match in longwake_regex.finditer(event_details):
+            for match in _LONGWAKE_RE.finditer(line_match.group('details')):
                 status, uid, tag = match.groups()
-                events.append({
-                    'timestamp': current_time,
-                    'type': 'longwake',
-                    'status': 'start' if status == '+' else 'end',
-                    'uid': uid,
-                    'tag': tag
-                })
+                events.append((
+                    current_time,
+                    'start' if status == b'+' else 'end',
+                    uid.decode('utf-8', errors='replace'),
+                    tag.decode('utf-8', errors='replace')
+                ))
     except Exception as e:
         print(f"Error parsing battery history from {file_path}: {e}")
-    return pd.DataFrame(events)
+    # History lines are already chronological, so this only reorders events that share a timestamp.
+    events.sort(key=_EVENT_ORDER)
+    return events
+
+@_cached_by_file
+def parse_batterystats(file_path):
+    """Parses both the power consumers and the longwake events from one batterystats.txt.
+
+    The file is mapped once for both sections, and the pair is cached as a single entry. Read
+    errors are raised so that they are not cached.
+    """
+    content = _map_file(file_path)
+    return parse_power_consumers(file_path, content), parse_battery_history(file_path, content)
 
 def get_package_map_from_log(log_dir):
     """Parses packages.txt from a log dir to create a UID-to-package-name map."""
@@ -133,76 +268,169 @@ def get_package_map_from_log(log_dir):
     packages_file = log_dir / 'packages.txt'
     if not packages_file.exists():
         return package_map
+    # One line per package, so stream it rather than holding the whole listing in memory.
     try:
-        content = packages_file.read_text(encoding='utf-8')
+        with packages_file.open(encoding='utf-8') as f:
+            for line in f:
+                match = _PACKAGE_RE.search(line)
+                if match:
+                    package_name, user_id = match.groups()
+                    if int(user_id) >= 10000:
+                        uid_str = f"u0a{int(user_id) - 10000}"
+                        package_map[uid_str] = package_name
     except Exception as e:
         print(f"Could not read {packages_file}: {e}")
-        return package_map
-
-    package_regex = re.compile(r"package:(.*?)\s+uid:(\d+)")
-    for line in content.splitlines():
-        match = package_regex.search(line)
-        if match:
-            package_name, user_id = match.groups()
-            if int(user_id) >= 10000:
-                uid_str = f"u0a{int(user_id) - 10000}"
-                package_map[uid_str] = package_name
     return package_map
 
 # --- DATA PROCESSING & AGGREGATION ---
 
-def process_all_logs():
-    log_dirs = get_log_dirs()
+def pair_longwake_events(events_df):
+    """Pairs time-sorted longwake starts and ends per (uid, tag) with a NumPy kernel.
+
+    Each end closes the earliest still-open start with the same uid and tag;
+    ends with nothing open are ignored.
+    """
+    # Work on plain integer arrays: one id per (uid, tag), built from the categorical codes,
+    # and int64 nanosecond timestamps.
+    uids = events_df['uid'].astype('category').cat
+    tags = events_df['tag'].astype('category').cat
+    group_ids = uids.codes.to_numpy(dtype='int64') * len(tags.categories) + tags.codes.to_numpy()
+    timestamps = events_df['timestamp'].to_numpy(dtype='datetime64[ns]').view('int64')
+    is_start = (events_df['status'] == 'start').to_numpy()
+
+    # Lay the events out group by group, keeping time order within each group.
+    order = np.argsort(group_ids, kind='stable')
+    group_ids, timestamps, is_start = group_ids[order], timestamps[order], is_start[order]
+    group_first = np.flatnonzero(np.r_[True, group_ids[1:] != group_ids[:-1]])
+    group_index = np.repeat(np.arange(len(group_first)), np.diff(np.r_[group_first, len(group_ids)]))
+
+    # Running balance of starts (+1) minus ends (-1) within each group.
+    steps = np.where(is_start, 1, -1)
+    totals = np.cumsum(steps)
+    balance = totals - (totals - steps)[group_first][group_index]
+
+    # An end only closes a start if the balance stays at or above its lowest point so far
+    # (capped at 0); otherwise nothing was open. Shifting each group below all earlier ones
+    # lets a single minimum.accumulate restart at every group boundary.
+    offsets = group_index * (2 * len(steps) + 1)
+    running_low = np.minimum.accumulate(np.minimum(balance, 0) - offsets) + offsets
+    prev_low = np.r_[0, running_low[:-1]]
+    prev_low[group_first] = 0
+    is_closing_end = ~is_start & (balance >= prev_low)
+
+    # The n-th start of a group is closed by its n-th closing end, so keep as many starts per
+    # group as it has closing ends; both selections are then in the same (group, n) order.
+    starts_seen = np.cumsum(is_start)
+    start_rank = starts_seen - (starts_seen - is_start)[group_first][group_index] - 1
+    closing_ends_per_group = np.bincount(group_index[is_closing_end], minlength=len(group_first))
+    is_closed_start = is_start & (start_rank < closing_ends_per_group[group_index])
+
+    durations_ns = timestamps[is_closing_end] - timestamps[is_closed_start]
+    periods = events_df[['uid', 'tag']].iloc[order[is_closing_end]].reset_index(drop=True)
+    periods['duration_s'] = durations_ns / 1e9
+    return periods
+
+def _sum_power_by_name(names, power_mah):
+    """Sums power_mah per distinct name, as a DataFrame with plain string names.
+
+    Only sums are needed, so a bincount over the factorized names does the job without
+    building a groupby.
+    """
+    codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+    totals = np.bincount(codes, weights=np.asarray(power_mah, dtype='float64'), minlength=len(uniques))
+    return pd.DataFrame({'name': uniques.astype(str), 'power_mah': totals})
+
+def parse_log_dir(log_dir):
+    """Parses one log dir: the battery level, plus the power consumers and longwake events.
+
+    Returns plain values and lists (not DataFrames) so results are cheap to send back from a
+    worker process.
+    """
+    stats_file = log_dir / 'batterystats.txt'
+    try:
+        consumers, events = parse_batterystats(stats_file)
+    except OSError as e:
+        # Not cached, so a file that was only locked or missing this time is read next run.
+        print(f"Could not read {stats_file}: {e}")
+        consumers, events = [], []
+    return parse_battery_level(log_dir / 'battery.txt'), consumers, events
+
+def process_all_logs(log_dirs=None):
+    """Parses and aggregates every log dir (or just the given, time-sorted log_dirs)."""
+    if log_dirs is None:
+        log_dirs = get_log_dirs()
     if not log_dirs:
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
     latest_log_dir = log_dirs[-1]
     app_map = get_package_map_from_log(latest_log_dir)
 
-    battery_df = pd.DataFrame([{'timestamp': datetime.strptime(d.name, '%Y-%m-%d_%H-%M'), 'level': parse_battery_level(d / 'battery.txt')} for d in log_dirs if parse_battery_level(d / 'battery.txt') is not None]).set_index('timestamp')
-
-    power_data = []
-    for log_dir in log_dirs:
-        power_data.extend(parse_power_consumers(log_dir / 'batterystats.txt'))
-    power_df = pd.DataFrame(power_data)
-    total_power_df = power_df.groupby('name')['power_mah'].sum().sort_values(ascending=False).reset_index() if not power_df.empty else pd.DataFrame(columns=['name', 'power_mah'])
-
-    # Map UIDs to app names and aggregate 'System/Other'
-    if not total_power_df.empty and app_map:
-        def map_uid_to_name(name):
-            if name.startswith('u0a') or name.isdigit():
-                return app_map.get(name, 'System/Other')
-            return name
-        total_power_df['name'] = total_power_df['name'].apply(map_uid_to_name)
-        
-        # Now that names are mapped, group by name again to aggregate all 'System/Other'
-        total_power_df = total_power_df.groupby('name')['power_mah'].sum().reset_index()
-
-    all_events_df = pd.concat([parse_battery_history(log_dir / 'batterystats.txt') for log_dir in log_dirs])
+    # Each log dir is independent, so dirs that still need parsing are spread across processes
+    # when there is more than one core to use. Cached dirs are just unpickled, which is far
+    # cheaper than starting a pool (on Windows each worker is spawned and re-imports numpy
+    # and pandas), so they are always read here.
+    uncached_dirs = [d for d in log_dirs if not parse_batterystats.is_cached(d / 'batterystats.txt')]
+    workers = min(len(uncached_dirs), os.cpu_count() or 1)
+    if os.name == 'nt':
+        workers = min(workers, 61)  # ProcessPoolExecutor's limit on Windows
+    parsed_by_dir = {}
+    if workers > 1:
+        # Hand out the uncached dirs in batches, about four per worker, so a first run over a
+        # long history doesn't cost one inter-process round trip per dir.
+        chunksize = max(1, len(uncached_dirs) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed_by_dir = dict(zip(uncached_dirs, executor.map(parse_log_dir, uncached_dirs, chunksize=chunksize)))
+    parsed_dirs = [parsed_by_dir[d] if d in parsed_by_dir else parse_log_dir(d) for d in log_dirs]
+
+    battery_rows = []
+    for d, (level, _, _) in zip(log_dirs, parsed_dirs):
+        if level is not None:
+            battery_rows.append({'timestamp': datetime.strptime(d.name, '%Y-%m-%d_%H-%M'), 'level': level})
+    battery_df = pd.DataFrame(battery_rows, columns=['timestamp', 'level']).astype({'level': 'int8'}).set_index('timestamp')
+
+    # Gather the consumers straight into one list per column; no per-row DataFrame is needed
+    # just to sum them.
+    power_names, power_values = [], []
+    for _, consumers, _ in parsed_dirs:
+        for name, power_mah in consumers:
+            power_names.append(name)
+            power_values.append(power_mah)
+    if not power_names:
+        total_power_df = pd.DataFrame(columns=['name', 'power_mah'])
+    else:
+        total_power_df = _sum_power_by_name(power_names, power_values)
+
+        # Map UIDs to app names and aggregate 'System/Other'
+        if app_map:
+            def map_uid_to_name(name):
+                if name.startswith('u0a') or name.isdigit():
+                    return app_map.get(name, 'System/Other')
+                return name
+            # Now that names are mapped, sum again to aggregate all 'System/Other'
+            total_power_df = _sum_power_by_name(total_power_df['name'].map(map_uid_to_name), total_power_df['power_mah'])
+
+        total_power_df = total_power_df.sort_values('power_mah', ascending=False, kind='stable', ignore_index=True)
+
+    # Each file's events are already in _EVENT_ORDER. Stats are not reset between collections,
+    # so every batterystats.txt covers the whole history since the last reset and the files
+    # overlap in time. heapq.merge interleaves them into one _EVENT_ORDER stream while keeping
+    # each file's own order (and file order for exact ties); it is there for that ordering,
+    # not for speed - it measures about the same as a stable sort of the combined frame.
+    per_dir_events = [events for _, _, events in parsed_dirs if events]
+    merged_events = heapq.merge(*per_dir_events, key=_EVENT_ORDER)
+    all_events_df = pd.DataFrame.from_records(list(merged_events), columns=_EVENT_COLUMNS)
     if all_events_df.empty:
         return battery_df, total_power_df, pd.DataFrame()
+    # uid/tag pairs repeat heavily, and pair_longwake_events groups on them several times;
+    # categorical codes let those groupbys work on small ints instead of hashing strings.
+    all_events_df = all_events_df.astype({'uid': 'category', 'tag': 'category', 'status': 'category'})
 
-    all_events_df.sort_values('timestamp', inplace=True)
-    starts = all_events_df[all_events_df['status'] == 'start'].copy()
-    ends = all_events_df[all_events_df['status'] == 'end'].copy()
-    
-    wakelock_periods = []
-    used_end_indices = set()
-
-    for start_idx, start_event in starts.iterrows():
-        potential_ends = ends[(ends['uid'] == start_event['uid']) & (ends['tag'] == start_event['tag']) & (ends['timestamp'] > start_event['timestamp']) & (~ends.index.isin(used_end_indices))]
-        if not potential_ends.empty:
-            end_event = potential_ends.iloc[0]
-            duration = (end_event['timestamp'] - start_event['timestamp']).total_seconds()
-            if duration >= 0:
-                wakelock_periods.append({'uid': start_event['uid'], 'tag': start_event['tag'], 'duration_s': duration})
-                used_end_indices.add(end_event.name)
-
-    if not wakelock_periods:
+    longwake_summary_df = pair_longwake_events(all_events_df)
+    if longwake_summary_df.empty:
         return battery_df, total_power_df, pd.DataFrame()
 
-    longwake_summary_df = pd.DataFrame(wakelock_periods)
-    total_longwake_df = longwake_summary_df.groupby(['uid', 'tag'])['duration_s'].sum().sort_values(ascending=False).reset_index()
+    total_longwake_df = longwake_summary_df.groupby(['uid', 'tag'], observed=True)['duration_s'].sum().sort_values(ascending=False).reset_index()
+    total_longwake_df = total_longwake_df.astype({'uid': str, 'tag': str})
 
     # Add a mapped app_name column for completeness
     if not total_longwake_df.empty and app_map:
@@ -214,8 +442,12 @@ def process_all_logs():
 
 # --- VISUALIZATION FUNCTIONS ---
 
+# matplotlib and seaborn are imported inside the plot functions so that code which only
+# needs the parsers doesn't pay for loading them.
+
 def plot_battery_level(battery_df):
     if battery_df.empty: return
+    import matplotlib.pyplot as plt
     plt.style.use('ggplot')
     battery_df.plot(y='level', marker='o', figsize=(12, 6), title='Battery Level Over Time')
     plt.ylabel('Battery Level (%)')
@@ -227,6 +459,8 @@ def plot_top_consumers(power_df, top_n=15):
     if power_df.empty: 
         print("No power consumption data found.")
         return
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     top_consumers = power_df.head(top_n)
     # The 'name' column is now clean, so we can use it directly.
     y_col = 'name'
@@ -243,10 +477,12 @@ def plot_top_longwakes(wakelock_df, top_n=20):
     if wakelock_df.empty:
         print("No significant longwake data to plot.")
         return
+    import matplotlib.pyplot as plt
+    import seaborn as sns
     top_items = wakelock_df.head(top_n).copy()
     # Use the new 'app_name' column for cleaner labels if it exists.
     if 'app_name' in top_items.columns:
-        top_items['label'] = top_items['app_name'] + ': ' + top_items['tag'].str.split('/').str[-1]
+        top_items['label'] = top_items['app_name'] + ': ' + top_items['tag'].str.rpartition('/')[2]
     else:
         top_items['label'] = top_items['uid'] + ': ' + top_items['tag']
     plt.style.use('ggplot')
@@ -293,17 +529,28 @@ def parse_device_info(log_dir_path):
     try:
         info_file = log_dir_path / 'device_info.txt'
         if info_file.exists():
-            lines = info_file.read_text().splitlines()
-            for i, line in enumerate(lines):
-                if "Model:" in line and i + 1 < len(lines) and lines[i+1].strip():
-                    info['model'] = lines[i+1].strip()
-                if "Android Version:" in line and i + 1 < len(lines) and lines[i+1].strip():
-                    info['android_version'] = lines[i+1].strip()
+            # Each value sits on the line after its label, so remember the previous line
+            # while streaming instead of loading the file into a list.
+            with info_file.open() as f:
+                previous_line = ''
+                for line in f:
+                    value = line.strip()
+                    if "Model:" in previous_line and value:
+                        info['model'] = value
+                    if "Android Version:" in previous_line and value:
+                        info['android_version'] = value
+                    previous_line = line
 
         stats_file = log_dir_path / 'batterystats.txt'
         if stats_file.exists():
-            content = stats_file.read_text()
-            cap_match = re.search(r'Capacity: (\d+)', content)
+            # Only the first Capacity line is needed: find() it in the mapped file and match
+            # the pattern right there instead of reading and decoding the whole dump.
+            content = _map_file(stats_file)
+            cap_match = None
+            cap_pos = content.find(b'Capacity: ')
+            while cap_pos >= 0 and not cap_match:
+                cap_match = _CAPACITY_RE.match(content, cap_pos)
+                cap_pos = content.find(b'Capacity: ', cap_pos + 1)
             if cap_match:
                 current_capacity = int(cap_match.group(1))
                 health = (current_capacity / ORIGINAL_CAPACITY_MAH) * 100
@@ -0,0 +1,221 @@
+import contextlib
+import io
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+import parsing
+
+
+class CachedByFileTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_path = Path(tmp_dir.name)
+        cache_dir = parsing.CACHE_DIR
+        parsing.CACHE_DIR = self.tmp_path / 'cache'
+        self.addCleanup(setattr, parsing, 'CACHE_DIR', cache_dir)
+
+    def test_errors_are_not_cached(self):
+        log_file = self.tmp_path / 'batterystats.txt'
+        log_file.write_text('data')
+        calls = []
+
+        @parsing._cached_by_file
+        def parse(file_path):
+            calls.append(file_path)
+            if len(calls) == 1:
+                raise PermissionError('file is locked')
+            return ['parsed']
+
+        with self.assertRaises(PermissionError):
+            parse(log_file)
+        self.assertEqual(parse(log_file), ['parsed'])
+        self.assertEqual(parse(log_file), ['parsed'])
+        self.assertEqual(len(calls), 2)
+
+    def test_corrupt_entry_is_dropped_and_parsed_again(self):
+        log_file = self.tmp_path / 'batterystats.txt'
+        log_file.write_text('data')
+        parse = parsing._cached_by_file(lambda file_path: ['parsed'])
+        parse(log_file)
+        cache_file, = parsing.CACHE_DIR.glob('*.pkl')
+        # A pickle that refers to a module that doesn't exist raises ModuleNotFoundError.
+        cache_file.write_bytes(b'cno_such_module\nthing\n.')
+
+        self.assertEqual(parse(log_file), ['parsed'])
+        self.assertTrue(parse.is_cached(log_file))
+        self.assertEqual(parse(log_file), ['parsed'])
+
+    def test_is_cached(self):
+        log_file = self.tmp_path / 'batterystats.txt'
+        log_file.write_text('data')
+        parse = parsing._cached_by_file(lambda file_path: ['parsed'])
+
+        self.assertFalse(parse.is_cached(log_file))
+        parse(log_file)
+        self.assertTrue(parse.is_cached(log_file))
+        self.assertFalse(parse.is_cached(self.tmp_path / 'missing.txt'))
+
+
+class ParseLogDirTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.log_dir = Path(tmp_dir.name) / '2025-09-01_08-00'
+        self.log_dir.mkdir()
+        cache_dir = parsing.CACHE_DIR
+        parsing.CACHE_DIR = Path(tmp_dir.name) / 'cache'
+        self.addCleanup(setattr, parsing, 'CACHE_DIR', cache_dir)
+
+    def test_unreadable_batterystats_is_parsed_again_later(self):
+        (self.log_dir / 'batterystats.txt').write_text(
+            'Battery History (1% used):\n'
+            '                    0 (10) RESET:TIME: 2025-09-01-08-00-00\n'
+            '        +7s413ms (2) 100 +longwake=u0a101:"NlpWakeLock"\n'
+        )
+        map_file = parsing._map_file
+
+        def locked(file_path):
+            raise PermissionError('file is locked')
+
+        parsing._map_file = locked
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual(parsing.parse_log_dir(self.log_dir), (None, [], []))
+        finally:
+            parsing._map_file = map_file
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, _, events = parsing.parse_log_dir(self.log_dir)
+        self.assertEqual(len(events), 1)
+
+
+class PairLongwakeEventsTest(unittest.TestCase):
+    def pair(self, events):
+        """Pairs (seconds, status, uid, tag) events, given in any order, as process_all_logs would."""
+        start = datetime(2025, 9, 1, 8, 0)
+        records = sorted(((start + timedelta(seconds=t), status, uid, tag) for t, status, uid, tag in events),
+                         key=parsing._EVENT_ORDER)
+        events_df = pd.DataFrame.from_records(records, columns=parsing._EVENT_COLUMNS)
+        events_df = events_df.astype({'uid': 'category', 'tag': 'category', 'status': 'category'})
+        periods = parsing.pair_longwake_events(events_df)
+        self.assertEqual(list(periods.columns), ['uid', 'tag', 'duration_s'])
+        return sorted(zip(periods['uid'].astype(str), periods['tag'].astype(str), periods['duration_s']))
+
+    def test_end_before_any_start_is_ignored(self):
+        self.assertEqual(self.pair([
+            (0, 'end', 'u0a1', 'sync'),
+            (10, 'start', 'u0a1', 'sync'),
+            (15, 'end', 'u0a1', 'sync'),
+        ]), [('u0a1', 'sync', 5.0)])
+
+    def test_overlapping_starts_close_in_order(self):
+        self.assertEqual(self.pair([
+            (0, 'start', 'u0a1', 'sync'),
+            (2, 'start', 'u0a1', 'sync'),
+            (5, 'end', 'u0a1', 'sync'),
+            (9, 'end', 'u0a1', 'sync'),
+            (12, 'end', 'u0a1', 'sync'),
+        ]), [('u0a1', 'sync', 5.0), ('u0a1', 'sync', 7.0)])
+
+    def test_interleaved_groups_pair_separately(self):
+        self.assertEqual(self.pair([
+            (0, 'start', 'u0a1', 'sync'),
+            (1, 'start', 'u0a2', 'sync'),
+            (2, 'start', 'u0a1', 'gps'),
+            (3, 'end', 'u0a1', 'sync'),
+            (4, 'end', 'u0a1', 'gps'),
+            (7, 'end', 'u0a2', 'sync'),
+            (8, 'end', 'u0a1', 'sync'),
+            (9, 'start', 'u0a2', 'sync'),
+        ]), [('u0a1', 'gps', 2.0), ('u0a1', 'sync', 3.0), ('u0a2', 'sync', 6.0)])
+
+    def test_end_and_start_at_the_same_instant(self):
+        # The end sorts ahead of the start, so it closes the earlier start rather than the new one.
+        self.assertEqual(self.pair([
+            (0, 'start', 'u0a1', 'sync'),
+            (5, 'start', 'u0a1', 'sync'),
+            (5, 'end', 'u0a1', 'sync'),
+            (8, 'end', 'u0a1', 'sync'),
+        ]), [('u0a1', 'sync', 3.0), ('u0a1', 'sync', 5.0)])
+        # With nothing open before it, the end is unmatched and never closes the same-instant start.
+        self.assertEqual(self.pair([
+            (5, 'start', 'u0a1', 'sync'),
+            (5, 'end', 'u0a1', 'sync'),
+            (8, 'end', 'u0a1', 'sync'),
+        ]), [('u0a1', 'sync', 3.0)])
+
+
+class ProcessAllLogsTest(unittest.TestCase):
+    def test_power_totals_keep_float64_values(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_dir = Path(tmp_dir) / 'logs' / '2025-09-01_08-00'
+            log_dir.mkdir(parents=True)
+            (log_dir / 'batterystats.txt').write_text(
+                '  Estimated power use (mAh):\n'
+                '    Capacity: 3300, Computed drain: 512, actual drain: 400-450\n'
+                '    Screen: 180.3 Excluded from smearing\n'
+                '    Uid 1000: 0.1\n'
+                '    Uid 1000: 0.2\n'
+            )
+            logs_dir, cache_dir = parsing.LOGS_DIR, parsing.CACHE_DIR
+            parsing.LOGS_DIR, parsing.CACHE_DIR = log_dir.parent, Path(tmp_dir) / 'cache'
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    _, power_df, _ = parsing.process_all_logs()
+            finally:
+                parsing.LOGS_DIR, parsing.CACHE_DIR = logs_dir, cache_dir
+        self.assertEqual(power_df['power_mah'].dtype, 'float64')
+        self.assertEqual(power_df.values.tolist(), [['Screen', 180.3], ['1000', 0.1 + 0.2]])
+
+
+class GetLogDirsTest(unittest.TestCase):
+    def test_only_timestamped_dirs_in_time_order(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            logs_dir = Path(tmp_dir)
+            for name in ('2025-09-02_08-00', 'old_backup', '2025-09-01_20-30'):
+                (logs_dir / name).mkdir()
+            (logs_dir / '2025-09-03_08-00').write_text('not a dir')
+            logs_dir_before = parsing.LOGS_DIR
+            parsing.LOGS_DIR = logs_dir
+            try:
+                names = [d.name for d in parsing.get_log_dirs()]
+            finally:
+                parsing.LOGS_DIR = logs_dir_before
+        self.assertEqual(names, ['2025-09-01_20-30', '2025-09-02_08-00'])
+
+
+class ParseTimeTest(unittest.TestCase):
+    def test_all_units(self):
+        self.assertEqual(parsing.parse_time('+1d02h03m04s005ms'),
+                         timedelta(days=1, hours=2, minutes=3, seconds=4, milliseconds=5))
+
+    def test_milliseconds_are_not_minutes(self):
+        self.assertEqual(parsing.parse_time(' +3s012ms '), timedelta(seconds=3, milliseconds=12))
+
+
+class ParseBatteryHistoryTest(unittest.TestCase):
+    def parse_history(self, text):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stats_file = Path(tmp_dir) / 'batterystats.txt'
+            stats_file.write_text(text)
+            return parsing.parse_battery_history(stats_file)
+
+    def test_offsets_of_a_day_or_more(self):
+        events = self.parse_history(
+            'Battery History (1% used):\n'
+            '                    0 (10) RESET:TIME: 2025-09-01-08-00-00\n'
+            '     +23h59m59s999ms (2) 100 +longwake=u0a101:"NlpWakeLock"\n'
+            '  +1d02h03m04s005ms (2) 100 -longwake=u0a101:"NlpWakeLock"\n'
+        )
+        self.assertEqual(events, [
+            (datetime(2025, 9, 2, 7, 59, 59, 999000), 'start', 'u0a101', 'NlpWakeLock'),
+            (datetime(2025, 9, 2, 10, 3, 4, 5000), 'end', 'u0a101', 'NlpWakeLock'),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()